@@ -0,0 +1,114 @@
+"""
+Asyncio API for converting presentations without writing anything to disk.
+
+Blocks are yielded as soon as their slide has been fetched and processed, while later slides are
+still being fetched and processed. Fetching and the CPU heavy extraction/processing are run in an
+executor (threads by default) so the event loop isn't blocked. Only a few fetches are queued on the
+executor at once so processing the slides already fetched isn't queued behind fetching all the others.
+"""
+import asyncio
+
+from core import process_slides, generate_manifest, generate_manifest_group
+from extract import extract_content
+from ids import check_unique_id
+
+
+async def stream_presentation(presentation=None, presentation_id=None, http=None, survey_title='manifest',
+                              executor=None, max_fetches=4, log=None):
+    """
+    Converts a presentation, yielding its blocks and groups as they are ready:
+
+        ('block', SlideResult)  for each slide that isn't skipped, in slide order
+        ('group', group)        when a group is complete, i.e. after its interstitial or the last slide
+        ('manifest', manifest)  once, at the end
+
+    :param presentation: A presentation dict, as returned by the Google Slides API
+    :param presentation_id: The id of a presentation to fetch instead, each slide is fetched separately
+    :param http: The authorised http to fetch with, see auth.auth_http
+    :param survey_title: The title of the survey
+    :param executor: The thread pool executor to fetch and convert in, defaults to the loop's default executor
+    :param max_fetches: The most slides to fetch at once
+    :param log: The logger to use, see core
+    :return: An async iterator of (event type, value) tuples
+    """
+    loop = asyncio.get_running_loop()
+
+    if presentation is not None:
+        slides = presentation.get('slides')
+        slide_ids = [slide.get('objectId') for slide in slides]
+
+        async def fetch(index):
+            return slides[index]
+    else:
+        service = await loop.run_in_executor(executor, _build_service, http)
+        slide_ids = await loop.run_in_executor(executor, _get_slide_ids, service, presentation_id)
+        # Acquired in slide order, the executor's queue is first in first out so a slide is processed
+        # after at most max_fetches fetches that were queued before it
+        fetching = asyncio.Semaphore(max_fetches)
+
+        async def fetch(index):
+            async with fetching:
+                return await loop.run_in_executor(executor, _get_slide, service, presentation_id, slide_ids[index])
+
+    async def convert(index):
+        slide = await fetch(index)
+        return await loop.run_in_executor(executor, _convert_slide, slide_ids, index, slide, log)
+
+    tasks = [asyncio.ensure_future(convert(i)) for i in range(len(slide_ids))]
+
+    groups = []
+    group_blocks = []
+    block_ids = set()
+
+    try:
+        for task in tasks:
+            result = await task
+
+            if not result.block:
+                continue
+
+            # Checked here rather than as each slide is processed as slides are processed concurrently
+            check_unique_id(block_ids, result.block['id'])
+
+            yield 'block', result
+
+            group_blocks.append(result.block['id'])
+
+            # Interstitial marks the end of a group
+            if result.interstitial:
+                groups.append(generate_manifest_group(len(groups), group_blocks))
+                group_blocks = []
+                yield 'group', groups[-1]
+
+        if group_blocks:
+            groups.append(generate_manifest_group(len(groups), group_blocks))
+            yield 'group', groups[-1]
+
+        yield 'manifest', generate_manifest(survey_title, groups)
+
+    finally:
+        # Stop any remaining work if the caller stops iterating early
+        for task in tasks:
+            task.cancel()
+
+
+def _convert_slide(slide_ids, index, slide, log):
+    content = extract_content(slide, log=log)
+    return next(process_slides(slide_ids, [content], start=index, log=log))
+
+
+def _build_service(http):
+    # Imported here so converting an in memory presentation doesn't need the Google API client
+    from apiclient import discovery
+    return discovery.build('slides', 'v1', http=http)
+
+
+def _get_slide_ids(service, presentation_id):
+    presentation = service.presentations().get(
+        presentationId=presentation_id, fields='slides.objectId').execute()
+    return [slide.get('objectId') for slide in presentation.get('slides')]
+
+
+def _get_slide(service, presentation_id, slide_id):
+    return service.presentations().pages().get(
+        presentationId=presentation_id, pageObjectId=slide_id).execute()
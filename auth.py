@@ -1,5 +1,9 @@
 import httplib2
 import os
+import threading
+import time
+
+from http.client import HTTPResponse
 
 from oauth2client import client, tools
 from oauth2client.file import Storage
@@ -13,7 +17,124 @@ APPLICATION_NAME = 'Google Slides to EQ YAML Manifests/Blocks'
 
 def auth_http(flags):
     credentials = _get_credentials(flags)
-    return credentials.authorize(httplib2.Http())
+    return PooledHttp(credentials, getattr(flags, 'http_cache', None))
+
+
+class PooledHttp(object):
+    """
+    An authorised HTTP client that can be shared between threads.
+
+    Each thread gets its own httplib2.Http, which keeps its connections open between requests,
+    while the credentials, HTTP cache directory (ETag revalidation is handled by httplib2)
+    and the transfer counters in `stats` are shared. The access token is refreshed under a lock,
+    both before it expires and when a request is rejected with a 401, so only one thread refreshes it.
+
+    Compressed responses are requested by googleapiclient itself (an accept-encoding header and a
+    '(gzip)' user agent); `stats['bytes']` counts the response bodies as received, before httplib2
+    decompresses them, and `stats['decoded_bytes']` counts them after.
+    """
+
+    def __init__(self, credentials, cache_dir=None):
+        self.credentials = credentials
+        self.cache_dir = cache_dir
+        self.stats = {
+            'requests': 0,
+            'cached': 0,
+            'compressed': 0,
+            'bytes': 0,
+            'decoded_bytes': 0,
+            'seconds': 0.0
+        }
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def request(self, uri, method='GET', body=None, headers=None, redirections=httplib2.DEFAULT_MAX_REDIRECTS,
+                connection_type=None):
+        self._refresh(expired_only=True)
+
+        headers = dict(headers or {})
+        access_token = self.credentials.access_token
+        self.credentials.apply(headers)
+
+        response, content = self._request(uri, method, body, headers, redirections, connection_type)
+
+        if response.status == 401:
+            self._refresh(rejected_token=access_token)
+            self.credentials.apply(headers)
+            response, content = self._request(uri, method, body, headers, redirections, connection_type)
+
+        return response, content
+
+    def _request(self, uri, method, body, headers, redirections, connection_type):
+        if connection_type is None:
+            connection_type = _COUNTING_CONNECTIONS.get(uri.partition(':')[0])
+
+        _received.bytes = 0
+        start = time.perf_counter()
+        response, content = self._http().request(uri, method, body, headers, redirections, connection_type)
+        elapsed = time.perf_counter() - start
+
+        with self._stats_lock:
+            self.stats['requests'] += 1
+            self.stats['cached'] += bool(getattr(response, 'fromcache', False))
+            self.stats['compressed'] += '-content-encoding' in response
+            self.stats['bytes'] += _received.bytes
+            self.stats['decoded_bytes'] += len(content or b'')
+            self.stats['seconds'] += elapsed
+
+        return response, content
+
+    def _http(self):
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = httplib2.Http(cache=self.cache_dir)
+            self._local.http = http
+        return http
+
+    def _refresh(self, expired_only=False, rejected_token=None):
+        """
+        Refreshes the access token under a lock so concurrent requests don't all refresh it at once
+        :param expired_only: Only refresh if there is no token or it has expired
+        :param rejected_token: The token a request was rejected with, not refreshed again if another
+                               thread has already replaced it
+        """
+        def needs_refresh():
+            if expired_only:
+                return not self.credentials.access_token or self.credentials.access_token_expired
+            return self.credentials.access_token == rejected_token
+
+        if needs_refresh():
+            with self._refresh_lock:
+                if needs_refresh():
+                    self.credentials.refresh(httplib2.Http())
+
+
+# The number of bytes of response bodies received by the current thread, see _CountingResponse
+_received = threading.local()
+
+
+class _CountingResponse(HTTPResponse):
+    """ Counts the bytes of a response body as they are read, before httplib2 decompresses them """
+
+    def read(self, amt=None):
+        data = super().read(amt)
+        _received.bytes = getattr(_received, 'bytes', 0) + len(data)
+        return data
+
+
+class _CountingHTTPConnection(httplib2.HTTPConnectionWithTimeout):
+    response_class = _CountingResponse
+
+
+class _CountingHTTPSConnection(httplib2.HTTPSConnectionWithTimeout):
+    response_class = _CountingResponse
+
+
+_COUNTING_CONNECTIONS = {
+    'http': _CountingHTTPConnection,
+    'https': _CountingHTTPSConnection
+}
 
 
 def _get_credentials(flags):
@@ -0,0 +1,204 @@
+import numpy as np
+
+from extract import ELEMENT_TYPES, get_style, intern_style, style_key, is_checkbox, is_comments_box
+
+_TYPE_CODES = {name: code for code, name in enumerate(ELEMENT_TYPES)}
+_TYPE_NAMES = np.array(ELEMENT_TYPES, dtype=object)
+
+_BLACK = 0.13333334
+
+
+def extract_deck(slides):
+    """
+    Extracts the content of every slide in a deck at once. All text runs are flattened into
+    columns and classified with vectorised masks, giving the same result as calling
+    extract_content on each slide except that each slide's elements are already ordered
+    by y-transform (as process_content would order them) and marked as 'ordered'
+    :param slides: The slides of a presentation
+    :return: A list with the extracted content for each slide, None for skipped slides
+    """
+    elements = []
+    runs = []
+    block_types = []
+    counts = []
+
+    for slide in slides:
+        start = len(elements)
+        block_types.append(_flatten_slide(slide, elements, runs))
+        counts.append(len(elements) - start)
+
+    if not elements:
+        return [None if block_type is None else _content([], block_type) for block_type in block_types]
+
+    slide_index = np.repeat(np.arange(len(slides)), counts)
+    has_content = np.array([bool(element['content']) for element in elements], dtype=bool)
+    bullet, translate_y = (np.array(column) for column in zip(*runs))
+
+    # Classified per distinct style rather than for every run
+    style_ids, style = np.unique([element['style_id'] for element in elements], return_inverse=True)
+    types = _classify(has_content, style, bullet, [style_key(get_style(i)) for i in style_ids.tolist()])
+
+    for element, element_type in zip(elements, _TYPE_NAMES[types].tolist()):
+        element['type'] = element_type
+
+    interstitial = np.zeros(len(slides), dtype=bool)
+    interstitial[slide_index[types == _TYPE_CODES['interstitial_title']]] = True
+
+    # lexsort is stable, so elements with the same translateY keep their original order
+    order = np.lexsort((translate_y.astype(np.float64), slide_index))
+    bounds = np.searchsorted(slide_index[order], np.arange(len(slides) + 1)).tolist()
+    elements = [elements[i] for i in order.tolist()]
+
+    return [
+        None if block_type is None else _content(elements[bounds[s]:bounds[s + 1]],
+                                                 'Interstitial' if interstitial[s] else block_type)
+        for s, block_type in enumerate(block_types)
+    ]
+
+
+def _content(elements, block_type):
+    return {
+        'elements': elements,
+        'answer_type': '',
+        'block_type': block_type,
+        'ordered': True
+    }
+
+
+def _flatten_slide(slide, elements, runs):
+    """
+    Adds an element (without its type) for each text run of a slide and works out its block type from its shapes
+    :param slide: The slide
+    :param elements: The list to add the elements to
+    :param runs: The list to add a (bullet, translateY) tuple to for each element, used to classify and order them.
+                 The tuple is shared by the runs of a paragraph rather than created for each of them.
+    :return: The block type, None if the slide is skipped and 'Interstitial' is resolved later
+    """
+    start = len(runs)
+
+    checkbox = False
+    radio = False
+    currency = False
+    comments = False
+    bullet = False
+    paragraph_index = 0
+    run = None
+
+    add_element = elements.append
+    add_run = runs.append
+
+    for element in (e for e in slide.get('pageElements') if 'shape' in e):
+        shape = element.get('shape')
+        transform = element.get('transform')
+        shape_type = shape.get('shapeType')
+
+        # The shape type checks of extract.py, written out as this is run for every shape of a deck
+        if shape_type == 'NO_SMOKING':
+            del runs[start:]
+            del elements[start:]
+            return None
+
+        elif shape_type == 'TEXT_BOX' and 'text' in shape:
+            translate_y = transform.get('translateY') or 0
+            run = (bullet, translate_y)
+
+            for text_element in shape.get('text').get('textElements'):
+                if 'paragraphMarker' in text_element:
+                    paragraph_index += 1
+                    paragraph_marker = text_element.get('paragraphMarker')
+                    bullet = bool(paragraph_marker) and paragraph_marker.get('bullet') is not None
+                    run = (bullet, translate_y)
+
+                if 'textRun' in text_element:
+                    text_run = text_element.get('textRun')
+                    add_element({
+                        'paragraph_index': paragraph_index,
+                        'content': text_run.get('content'),
+                        'style_id': intern_style(text_run.get('style')),
+                        'transform': transform,
+                        'type': None
+                    })
+                    add_run(run)
+
+        elif is_checkbox(shape):
+            checkbox = True
+
+        elif shape_type == 'ELLIPSE':
+            radio = True
+
+        elif shape_type == 'ROUND_RECTANGLE':
+            currency = True
+
+        elif is_comments_box(shape):
+            comments = True
+
+    if checkbox:
+        return 'Checkbox'
+    elif radio:
+        return 'Radio'
+    elif currency:
+        return 'Currency'
+    elif comments:
+        return 'TextArea'
+
+    return 'Number'
+
+
+def _classify(has_content, style, bullet, style_keys):
+    """
+    Assigns an element type code to every text run, following the precedence of extract._get_type
+    :param has_content: Whether each run has any content
+    :param style: The index of the style key of each run
+    :param bullet: Whether each run is in a bullet list paragraph
+    :param style_keys: The distinct style keys, see extract.style_key
+    :return: An array of ELEMENT_TYPES indexes
+    """
+    font_size, bold, black = (column[style] for column in _style_columns(style_keys))
+
+    guidance = font_size == 16
+
+    conditions = [
+        ~has_content | ~black,
+        font_size == 30,
+        font_size == 28,
+        font_size == 24,
+        font_size == 22,
+        font_size == 20,
+        guidance & bold & ~bullet,
+        guidance & ~bullet,
+        guidance & bullet,
+        font_size == 18,
+        font_size == 14,
+        font_size == 12,
+        font_size == 13,
+        font_size == 9
+    ]
+
+    return np.select(conditions, np.arange(len(conditions)), default=_TYPE_CODES['ignored'])
+
+
+def _style_columns(style_keys):
+    """
+    Builds the font size, bold and black text columns used for classification from each distinct
+    style key; a missing font size is NaN so it never compares equal
+    """
+    font_size = np.full(len(style_keys), np.nan)
+    bold = np.zeros(len(style_keys), dtype=bool)
+    black = np.ones(len(style_keys), dtype=bool)
+
+    for i, key in enumerate(style_keys):
+        if key is None:
+            continue
+
+        size, is_bold, rgb_color, _ = key
+
+        if isinstance(size, (int, float)):
+            font_size[i] = size
+
+        bold[i] = is_bold
+
+        # No text colour counts as black, otherwise only exactly red, green and blue all matching
+        if rgb_color is not None:
+            black[i] = rgb_color == (_BLACK, _BLACK, _BLACK, 3)
+
+    return font_size, bold, black
@@ -1,137 +1,330 @@
 #!/usr/bin/env python
 import argparse
+import importlib.util
+import json
+import logging
 import os
 import pathlib
+import sys
 import yaml
 
+from concurrent.futures import ThreadPoolExecutor
+
 from apiclient import discovery
 from oauth2client import tools
 
 from auth import auth_http
-from extract import extract_content
-from process import process_content, generate_id
+from core import convert_slides, extract_slides, process_slides, process_structure, group_variant_blocks, \
+    block_hash, generate_manifest, generate_manifest_groups
+from extract import extract_structure
+from ir import load_ir, write_ir
+
+# Named rather than __name__ as this module is usually run as __main__
+logger = logging.getLogger('convert')
+
+# The loggers of the progress messages shown when run from the command line
+LOGGERS = ('convert', 'core', 'extract')
 
 
 def convert(flags):
-    service = discovery.build('slides', 'v1', http=auth_http(flags))
+    if flags.ir_in:
+        slide_ids, contents = load_ir(flags.ir_in)
+
+        with contents:
+            _convert(flags, slide_ids, contents=contents)
+    else:
+        http = auth_http(flags)
+        service = discovery.build('slides', 'v1', http=http)
+
+        slides = get_slides(service, flags.presentation_id)
+        _convert(flags, [slide.get('objectId') for slide in slides], slides=slides)
+
+        log_transfer_stats(http)
+
+
+def _convert(flags, slide_ids, slides=None, contents=None):
+    """
+    Converts the slides of a presentation into block files and a manifest, keeping a checkpoint journal
+    :param flags: Parsed user input
+    :param slide_ids: The object ids of the slides
+    :param slides: The slides to extract, if their extracted contents aren't given
+    :param contents: The extracted content of each slide, e.g. loaded from an IR file
+    """
+    if flags.ir_out:
+        if contents is None:
+            contents = list(extract_slides(slides, engine=flags.engine))
+        write_ir(flags.ir_out, slide_ids, contents)
+
+    journal_file = os.path.join(flags.manifest_out, '.' + flags.survey_title + '.journal')
+
+    journal = []
+    block_files = {}
+
+    if flags.resume:
+        entries = read_journal(journal_file, slide_ids)
+        journal = verify_journal(flags, entries)
+        # Slides that are converted again overwrite the block files they were written to last time
+        block_files = {entry['slide']: entry.get('file') for entry in entries[len(journal):]}
+        logger.info('Resuming from Slide #%s', len(journal) + 1)
+
+    start = len(journal)
+
+    if contents is None:
+        contents = extract_slides(slides[start:], engine=flags.engine)
+    else:
+        contents = contents[start:]
+
+    group_index = sum(entry['interstitial'] for entry in journal)
+    block_ids = {entry['block_id'] for entry in journal if entry['block_id']}
+
+    with open(journal_file, 'w') as f:
+        # Rewritten to drop any incomplete entry left by a failed run
+        f.writelines(json.dumps(entry) + '\n' for entry in journal)
+        f.flush()
+
+        for result in process_slides(slide_ids, contents, start=start, block_ids=block_ids):
+            entry = {
+                'slide': result.index,
+                'slide_id': result.slide_id,
+                'block_id': None,
+                'group': None,
+                'interstitial': False,
+                'hash': None,
+                'file': None
+            }
+
+            if result.block:
+                entry.update({
+                    'file': create_yaml_block(flags, result.block, block_files.get(result.index)),
+                    'block_id': result.block['id'],
+                    'group': group_index,
+                    'interstitial': result.interstitial,
+                    'hash': block_hash(result.block)
+                })
+                group_index += entry['interstitial']
+
+            # Flushed per slide so a failed run can be resumed from the next slide
+            f.write(json.dumps(entry) + '\n')
+            f.flush()
+            journal.append(entry)
+
+    groups = generate_manifest_groups(
+        [(entry['block_id'], entry['interstitial']) for entry in journal if entry['block_id']])
+
+    create_yaml_manifest(flags.manifest_out, flags.survey_title, flags.survey_title, groups)
+
+    # Only needed to resume an incomplete conversion
+    os.remove(journal_file)
+
+
+def convert_manifest_only(flags):
+    """
+    Generates only the manifest, slides are classified just enough to find the interstitials and
+    block ids; no answers, guidance or block files are generated
+    :param flags: Parsed user input
+    """
+    if flags.ir_in:
+        slide_ids, contents = load_ir(flags.ir_in)
+
+        with contents:
+            groups = generate_manifest_groups(process_structure(slide_ids, contents))
+    else:
+        http = auth_http(flags)
+        service = discovery.build('slides', 'v1', http=http)
+
+        slides = get_slides(service, flags.presentation_id)
+        slide_ids = [slide.get('objectId') for slide in slides]
+        groups = generate_manifest_groups(process_structure(slide_ids, map(extract_structure, slides)))
+
+        log_transfer_stats(http)
+
+    create_yaml_manifest(flags.manifest_out, flags.survey_title, flags.survey_title, groups)
+
+
+def read_journal(journal_file, slide_ids):
+    """
+    Reads the checkpoint journal of a previous run, an incomplete last line (from a run that
+    was killed while writing it) is ignored
+    :param journal_file: The path of the journal
+    :param slide_ids: The object ids of the slides being converted
+    :return: A list of journal entries, one for each completed slide in order
+    """
+    journal = []
+
+    if not os.path.isfile(journal_file):
+        return journal
+
+    with open(journal_file, 'r') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+
+            index = len(journal)
+            if index >= len(slide_ids) or entry['slide'] != index or entry['slide_id'] != slide_ids[index]:
+                raise ValueError('journal {} does not match the presentation at slide #{}'.format(
+                    journal_file, index + 1))
+
+            journal.append(entry)
+
+    return journal
+
+
+def verify_journal(flags, journal):
+    """
+    Checks the block file each journaled slide was written to still has the content it was written with, the
+    journal is cut short at the first slide with a missing, changed or unreadable block file so it is converted again
+    :param flags: Parsed user input, for the blocks directory and survey variant
+    :param journal: The journal entries of a previous run, see read_journal
+    :return: The journal entries up to the first slide that needs converting again
+    """
+    for index, entry in enumerate(journal):
+        if entry['block_id'] and block_hash(_read_yaml_block(flags, entry.get('file'))) != entry['hash']:
+            return journal[:index]
+
+    return journal
+
+
+def _read_yaml_block(flags, block_file_name):
+    """
+    Reads a block file, a missing file or one that can't be parsed (e.g. left truncated by a killed run) is None
+    """
+    block_file = os.path.join(flags.blocks_out, '{}.yaml'.format(block_file_name))
+
+    if not block_file_name or not os.path.isfile(block_file):
+        return None
+
+    with open(block_file, 'r') as f:
+        try:
+            return yaml.safe_load(f)
+        except yaml.YAMLError:
+            return None
+
+
+def convert_variants(flags):
+    """
+    Converts several presentations (one per survey variant) in a single run. Presentations
+    are fetched and processed concurrently, identical blocks are grouped by content hash
+    in memory and the shared/variant block files and a manifest per variant are then
+    written in a single pass.
+    :param flags: Parsed user input, flags.variant is a list of (presentation_id, variant) pairs
+    """
+    http = auth_http(flags)
+
+    with ThreadPoolExecutor() as executor:
+        futures = [executor.submit(_convert_presentation, http, presentation_id, flags.survey_title, flags.engine)
+                   for presentation_id, _ in flags.variant]
+
+        results = [future.result() for future in futures]
 
-    slides = get_slides(service, flags.presentation_id)
+    variant_blocks = []
 
-    groups = []
-    blocks = []
+    for (_, variant), result in zip(flags.variant, results):
+        variant_blocks.append((variant, result.blocks))
 
-    for i, slide in enumerate(slides):
-        print('Processing Slide #{} (id={})...'.format(i + 1, slide.get('objectId')))
-        content = extract_content(slide)
-        if content:
-            processed = process_content(i, content)
-            block = generate_manifest_block(processed)
-            create_yaml_block(flags, block)
-            blocks.append(block['id'])
+        manifest_file = os.path.join(flags.manifest_out, '{}-{}.yaml'.format(flags.survey_title, variant))
+        write_yaml(manifest_file, result.manifest)
 
-            # Interstitial marks the end of a group
-            if content.get('block_type') == 'Interstitial':
-                group = generate_manifest_group(len(groups), blocks)
-                groups.append(group)
-                blocks = []
+    for block_file_name, block in group_variant_blocks(variant_blocks):
+        write_yaml(os.path.join(flags.blocks_out, block_file_name + '.yaml'), block)
 
-    if blocks:
-        group = generate_manifest_group(len(groups), blocks)
-        groups.append(group)
+    log_transfer_stats(http)
 
-    manifest = generate_manifest(flags.survey_title, groups)
-    manifest_file = os.path.join(flags.manifest_out, flags.survey_title + '.yaml')
-    with open(manifest_file, 'w') as f:
-        yaml.dump(manifest, f, default_flow_style=False)
 
+def _convert_presentation(http, presentation_id, survey_title, engine):
+    service = discovery.build('slides', 'v1', http=http)
 
-def create_yaml_block(flags, block):
+    slides = get_slides(service, presentation_id)
+
+    return convert_slides(slides, survey_title, engine=engine)
+
+
+def create_yaml_manifest(manifest_out, manifest_name, survey_title, groups):
+    manifest = generate_manifest(survey_title, groups)
+    manifest_file = os.path.join(manifest_out, manifest_name + '.yaml')
+    write_yaml(manifest_file, manifest)
+
+
+def create_yaml_block(flags, block, block_file_name=None):
     """
     Checks if a YAML block file already exists for the given block,
     if so, compares the content of the file with the given
     block and creates a new variant YAML block file if different.
-    If there is no existing YAML file then a new one is created.
+    If there is no existing YAML file, or it can't be parsed, then a new one is created.
     :param flags: Parses user input to define block file names
     :param block: Generated manifest block
-    :return: Returns Block Yaml files
+    :param block_file_name: The block file this slide was written to by a previous run being resumed, it is
+                            overwritten rather than compared if it is still a file of this block
+    :return: The name of the block file written (without the extension), or of the existing one it matched
     """
-    block_file = os.path.join(flags.blocks_out, block['id'] + '.yaml')
+    if block_file_name not in (block['id'], block['id'] + '-' + flags.survey_variant):
+        block_file_name = block['id']
+        existing = _read_yaml_block(flags, block_file_name)
 
-    if os.path.isfile(block_file):
-        with open(block_file, 'r+') as f:
-            block_content = yaml.load(f)
+        if existing is not None and existing != block:
+            block_file_name = block['id'] + '-' + flags.survey_variant
+        elif existing == block:
+            return block_file_name
 
-        if block_content != block:
+    write_yaml(os.path.join(flags.blocks_out, block_file_name + '.yaml'), block)
 
-            block_file_variant = os.path.join(flags.blocks_out, block['id'] + '-' + flags.survey_variant + '.yaml')
+    return block_file_name
 
-            with open(block_file_variant, 'w') as f:
-                yaml.dump(block, f, default_flow_style=False)
 
-    else:
-        with open(block_file, 'w') as f:
-            yaml.dump(block, f, default_flow_style=False)
+def write_yaml(yaml_file, content):
+    """
+    Writes a YAML file atomically, it is written to a temporary file in the same directory which then
+    replaces it so a failed run never leaves a partly written file behind
+    """
+    directory, file_name = os.path.split(yaml_file)
+    temp_file = os.path.join(directory, '.' + file_name + '.tmp')
+
+    try:
+        with open(temp_file, 'w') as f:
+            yaml.dump(content, f, default_flow_style=False)
+        os.replace(temp_file, yaml_file)
+    except BaseException:
+        if os.path.isfile(temp_file):
+            os.remove(temp_file)
+        raise
 
 
 def get_slides(service, presentation_id):
     presentation = service.presentations().get(
         presentationId=presentation_id).execute()
     slides = presentation.get('slides')
-    print('The presentation contains {} slides:'.format(len(slides)))
+    logger.info('The presentation contains %s slides:', len(slides))
     return slides
 
 
-def generate_manifest(survey_title, groups):
-    manifest = {
-        'legal_basis': "StatisticsOfTradeAct",
-        'mime_type': 'application/json/ons/eq',
-        'schema_filename': '',
-        'schema_version': '0.0.1',
-        'data_version': '0.0.2',
-        'survey_id': generate_id(survey_title),
-        'title': survey_title,
-        'description': survey_title,
-        'theme': 'default',
-        'groups': groups
-    }
-
-    return manifest
+def log_transfer_stats(http):
+    stats = http.stats
+    logger.info('%s request(s) (%s from cache, %s compressed), %s bytes received (%s decompressed) in %.2fs',
+                stats['requests'], stats['cached'], stats['compressed'], stats['bytes'], stats['decoded_bytes'],
+                stats['seconds'])
 
 
-def generate_manifest_group(index, blocks):
-    return {
-        'id': 'group-{}'.format(index),
-        'title': '',
-        'blocks': blocks
-    }
-
-
-def generate_manifest_block(content: object) -> object:
-    block = {
-        'type': content.get('block_type'),
-        'id': content.get('block_id'),
-        'title': content.get('block_title'),
-        'questions': []
-    }
-
-    question = {
-        'id': content.get('question_id'),
-        'title': content.get('question_title'),
-        'description': content.get('question_description'),
-        'type': 'General',
-        'answers': content.get('answers')
-
-    }
-
-    if content.get('question_number'):
-        question['number'] = content.get('question_number')
+def configure_logging():
+    """
+    Shows the progress messages of the conversion on stdout, only the loggers of this project are
+    configured so the logging of other libraries is left as it is
+    """
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter('%(message)s'))
 
-    if content.get('question_guidance'):
-        question['guidance'] = content.get('question_guidance')
+    for name in LOGGERS:
+        log = logging.getLogger(name)
+        log.setLevel(logging.INFO)
+        log.addHandler(handler)
+        log.propagate = False
 
-    block['questions'].append(question)
 
-    return block
+def _variant(value):
+    presentation_id, separator, variant = value.partition(':')
+    if not presentation_id or not separator or not variant:
+        raise argparse.ArgumentTypeError('expected PRESENTATION_ID:VARIANT, got {!r}'.format(value))
+    return presentation_id, variant
 
 
 if __name__ == '__main__':
@@ -139,10 +332,16 @@ if __name__ == '__main__':
 
     parser.add_argument('--presentation_id',
                         type=str,
-                        required=True,
                         help='The id of the Google Slides presentation to convert, an example can be found in '
                              'the README')
 
+    parser.add_argument('--variant',
+                        type=_variant,
+                        action='append',
+                        metavar='PRESENTATION_ID:VARIANT',
+                        help='A presentation id and the form type it is for, can be repeated to convert several '
+                             'variants in one run instead of using --presentation_id')
+
     parser.add_argument('--manifest_out',
                         type=str,
                         default='Manifests',
@@ -153,6 +352,33 @@ if __name__ == '__main__':
                         default='Blocks',
                         help='The directory path of where the YAML block(s) output should be stored')
 
+    parser.add_argument('--resume',
+                        action='store_true',
+                        help='Continue a failed conversion, skipping the slides recorded in the checkpoint journal '
+                             'kept in the manifest directory')
+
+    parser.add_argument('--engine',
+                        choices=['scalar', 'columnar'],
+                        default='scalar',
+                        help='The extraction engine, columnar classifies a whole presentation at once using NumPy '
+                             '(which needs installing separately)')
+
+    parser.add_argument('--ir_out',
+                        type=str,
+                        help='The file path to save the extracted presentation to as a binary IR file')
+
+    parser.add_argument('--ir_in',
+                        type=str,
+                        help='The file path of a binary IR file to convert instead of fetching a presentation')
+
+    parser.add_argument('--manifest_only',
+                        action='store_true',
+                        help='Only generate the manifest, no block files are created')
+
+    parser.add_argument('--http_cache',
+                        type=str,
+                        help='The directory path of an HTTP cache, responses are revalidated using their ETag')
+
     parser.add_argument('--survey_title',
                         type=str,
                         default='manifest',
@@ -165,14 +391,31 @@ if __name__ == '__main__':
 
     _flags = parser.parse_args()
 
-    pathlib.Path(_flags.blocks_out).mkdir(parents=True, exist_ok=True)
+    if not _flags.presentation_id and not _flags.variant and not _flags.ir_in:
+        parser.error('one of --presentation_id, --variant or --ir_in is required')
 
-    pathlib.Path(_flags.manifest_out).mkdir(parents=True, exist_ok=True)
+    if _flags.variant and (_flags.ir_in or _flags.ir_out):
+        parser.error('--ir_in and --ir_out can only be used with a single presentation')
 
-    convert(_flags)
+    if _flags.resume and _flags.variant:
+        parser.error('--resume can only be used with --presentation_id')
 
+    if _flags.manifest_only and (_flags.variant or _flags.resume or _flags.ir_out):
+        parser.error('--manifest_only can not be used with --variant, --resume or --ir_out')
 
+    if _flags.engine == 'columnar' and importlib.util.find_spec('numpy') is None:
+        parser.error('--engine=columnar needs NumPy, install it with pip install numpy')
 
+    configure_logging()
 
+    if not _flags.manifest_only:
+        pathlib.Path(_flags.blocks_out).mkdir(parents=True, exist_ok=True)
 
+    pathlib.Path(_flags.manifest_out).mkdir(parents=True, exist_ok=True)
 
+    if _flags.manifest_only:
+        convert_manifest_only(_flags)
+    elif _flags.variant:
+        convert_variants(_flags)
+    else:
+        convert(_flags)
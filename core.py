@@ -0,0 +1,243 @@
+"""
+The conversion core: extracting, processing and generating manifests and blocks from slides.
+
+Nothing here does any I/O other than logging (to an injectable logger), so these functions can be
+called from several threads (or sub-interpreters) at once. The state shared between calls is all
+module level:
+
+- The style table of extract.py (_styles and _style_ids), added to by intern_style whenever a style
+  key is seen for the first time. Adding holds _style_lock and a style is appended before its id is
+  published, so get_style always finds an id it is given. Styles are never removed as their ids are
+  kept in extracted content, so the table grows by one entry per distinct style key (font size, bold,
+  colour and background) the process sees. Presentations reuse a handful of styles so it stays small,
+  even for a long running process such as one embedding aio.
+- The type memo of extract.py (_style_types), at most two entries per style. It is written without the
+  lock as every writer of a key stores the same type and single dict reads and writes are atomic.
+- The functools.lru_cache caches of ids.py (generate_id and extract_title_number), which are thread
+  safe and bounded to 4096 entries each.
+
+Each sub-interpreter has its own copy of all of these.
+"""
+import hashlib
+import json
+import logging
+
+from collections import namedtuple
+
+from extract import extract_content
+from ids import generate_id, check_unique_id
+from process import process_content, process_block_id
+
+logger = logging.getLogger(__name__)
+
+SlideResult = namedtuple('SlideResult', ['index', 'slide_id', 'content', 'block', 'interstitial'])
+SlideResult.__doc__ = 'The result of processing a slide, content and block are None for skipped slides'
+
+ConversionResult = namedtuple('ConversionResult', ['manifest', 'blocks', 'slides'])
+ConversionResult.__doc__ = 'The manifest, the blocks and the SlideResult of every slide of a presentation'
+
+
+def convert_slides(slides, survey_title, engine='scalar', log=None):
+    """
+    Converts the slides of a presentation into a manifest and blocks
+    :param slides: The slides of a presentation
+    :param survey_title: The title of the survey
+    :param engine: The extraction engine, see extract_slides
+    :param log: The logger to use, defaults to the logger of this module
+    :return: A ConversionResult
+    """
+    slide_ids = [slide.get('objectId') for slide in slides]
+    contents = extract_slides(slides, engine=engine, log=log)
+
+    return convert_contents(slide_ids, contents, survey_title, log=log)
+
+
+def convert_contents(slide_ids, contents, survey_title, log=None):
+    """
+    Converts the extracted content of the slides of a presentation into a manifest and blocks
+    :param slide_ids: The object ids of the slides
+    :param contents: The extracted content of each slide, see extract_slides
+    :param survey_title: The title of the survey
+    :param log: The logger to use, defaults to the logger of this module
+    :return: A ConversionResult
+    """
+    results = list(process_slides(slide_ids, contents, log=log))
+
+    groups = generate_manifest_groups([(r.block['id'], r.interstitial) for r in results if r.block])
+
+    return ConversionResult(generate_manifest(survey_title, groups), [r.block for r in results if r.block], results)
+
+
+def extract_slides(slides, engine='scalar', log=None):
+    """
+    Extracts the content of each slide
+    :param slides: The slides to extract
+    :param engine: 'scalar' to extract slide by slide or 'columnar' to extract all slides at once with NumPy
+    :param log: The logger to use, defaults to the logger of this module
+    :return: An iterable of the extracted content of each slide, None for skipped slides
+    """
+    if engine == 'columnar':
+        # Imported here so NumPy is only needed when using the columnar engine
+        from columnar import extract_deck
+        return extract_deck(slides)
+
+    return (extract_content(slide, log=log) for slide in slides)
+
+
+def process_slides(slide_ids, contents, start=0, block_ids=None, log=None):
+    """
+    Processes the extracted content of each slide
+    :param slide_ids: The object ids of all the slides of a presentation
+    :param contents: The extracted content of the slides from start onwards, see extract_slides
+    :param start: The index of the first slide to process
+    :param block_ids: The set of block ids already used in this run, checked and added to so duplicates are caught
+    :param log: The logger to use, defaults to the logger of this module
+    :return: An iterator of SlideResult
+    """
+    log = log or logger
+    block_ids = set() if block_ids is None else block_ids
+    contents = iter(contents)
+
+    for i in range(start, len(slide_ids)):
+        log.info('Processing Slide #%s (id=%s)...', i + 1, slide_ids[i])
+        content = next(contents)
+        block = None
+        if content:
+            processed = process_content(i, content)
+            block = generate_manifest_block(processed)
+            check_unique_id(block_ids, block['id'])
+        interstitial = bool(content) and content.get('block_type') == 'Interstitial'
+        yield SlideResult(i, slide_ids[i], content, block, interstitial)
+
+
+def process_structure(slide_ids, contents, log=None):
+    """
+    Works out only the block ids and interstitials of slides, see extract_structure
+    :param slide_ids: The object ids of the slides
+    :param contents: The extracted structure (or full content) of each slide
+    :param log: The logger to use, defaults to the logger of this module
+    :return: A list of (block id, is interstitial) tuples for the slides that aren't skipped
+    """
+    log = log or logger
+    blocks = []
+    block_ids = set()
+
+    for i, content in enumerate(contents):
+        log.info('Processing Slide #%s (id=%s)...', i + 1, slide_ids[i])
+        if content:
+            block_id = check_unique_id(block_ids, process_block_id(i, content))
+            blocks.append((block_id, content.get('block_type') == 'Interstitial'))
+
+    return blocks
+
+
+def group_variant_blocks(variant_blocks):
+    """
+    Groups the blocks of every variant by id and content hash. For each block id the content shared
+    by the most variants is the common block, any other content is a variant block for each variant using it.
+    :param variant_blocks: A list of (variant, blocks) tuples
+    :return: A list of (block file name, block) tuples, e.g. ('block-id', block) or ('block-id-0102', block)
+    """
+    blocks_by_id = {}
+
+    for variant, blocks in variant_blocks:
+        for block in blocks:
+            blocks_by_hash = blocks_by_id.setdefault(block['id'], {})
+            _, variants = blocks_by_hash.setdefault(block_hash(block), (block, []))
+            variants.append(variant)
+
+    block_files = []
+
+    for block_id, blocks_by_hash in blocks_by_id.items():
+        # sorted is stable, so on a tie the content of the first variant given is shared
+        shared, *others = sorted(blocks_by_hash.values(), key=lambda x: len(x[1]), reverse=True)
+
+        block_files.append((block_id, shared[0]))
+
+        for block, variants in others:
+            for variant in variants:
+                block_files.append((block_id + '-' + variant, block))
+
+    return block_files
+
+
+def block_hash(block):
+    return hashlib.sha1(json.dumps(block, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def generate_manifest(survey_title, groups):
+    manifest = {
+        'legal_basis': "StatisticsOfTradeAct",
+        'mime_type': 'application/json/ons/eq',
+        'schema_filename': '',
+        'schema_version': '0.0.1',
+        'data_version': '0.0.2',
+        'survey_id': generate_id(survey_title),
+        'title': survey_title,
+        'description': survey_title,
+        'theme': 'default',
+        'groups': groups
+    }
+
+    return manifest
+
+
+def generate_manifest_groups(blocks):
+    """
+    Splits blocks into groups, each interstitial marks the end of a group
+    :param blocks: A list of (block id, is interstitial) tuples
+    :return: A list of manifest groups
+    """
+    groups = []
+    group_blocks = []
+
+    for block_id, interstitial in blocks:
+        group_blocks.append(block_id)
+
+        # Interstitial marks the end of a group
+        if interstitial:
+            group = generate_manifest_group(len(groups), group_blocks)
+            groups.append(group)
+            group_blocks = []
+
+    if group_blocks:
+        group = generate_manifest_group(len(groups), group_blocks)
+        groups.append(group)
+
+    return groups
+
+
+def generate_manifest_group(index, blocks):
+    return {
+        'id': 'group-{}'.format(index),
+        'title': '',
+        'blocks': blocks
+    }
+
+
+def generate_manifest_block(content: object) -> object:
+    block = {
+        'type': content.get('block_type'),
+        'id': content.get('block_id'),
+        'title': content.get('block_title'),
+        'questions': []
+    }
+
+    question = {
+        'id': content.get('question_id'),
+        'title': content.get('question_title'),
+        'description': content.get('question_description'),
+        'type': 'General',
+        'answers': content.get('answers')
+
+    }
+
+    if content.get('question_number'):
+        question['number'] = content.get('question_number')
+
+    if content.get('question_guidance'):
+        question['guidance'] = content.get('question_guidance')
+
+    block['questions'].append(question)
+
+    return block
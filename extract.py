@@ -1,10 +1,48 @@
-from utils import get_dict_nested_value
+import logging
+import threading
 
+from utils import get_dict_nested_value
 
-def extract_content(slide):
+# The element types in the precedence order of _get_type, 'ignored' being the fallback
+ELEMENT_TYPES = (
+    'ignored',
+    'interstitial_title',
+    'interstitial_description',
+    'block_title',
+    'block_description',
+    'question_title',
+    'question_guidance_title',
+    'question_guidance_description',
+    'question_guidance_list',
+    'question_description',
+    'answer_label',
+    'answer_prompt',
+    'answer_option',
+    'answer_q_code'
+)
+
+BLOCK_TYPES = ('Interstitial', 'Checkbox', 'Radio', 'Currency', 'TextArea', 'Number')
+
+logger = logging.getLogger(__name__)
+
+# Text run styles are interned so each distinct style is only stored and classified once per process,
+# keyed on only the fields that are read (see style_key). Elements refer to their style by its index in
+# _styles. Only adding a style needs the lock, the type memo may be written by several threads at once as
+# they would all store the same type. Nothing is ever removed as style ids are kept in extracted content,
+# both grow with the number of distinct style keys the process sees (see core for all shared state).
+_styles = []
+_style_ids = {}
+_style_types = {}
+_style_lock = threading.Lock()
+
+# Stands in for missing dicts in style_key, never modified
+_EMPTY = {}
+
+
+def extract_content(slide, log=None):
     elements = slide.get('pageElements')
 
-    print('{} elements'.format(len(elements)))
+    (log or logger).info('%s elements', len(elements))
 
     extracted = {
         'elements': [],
@@ -36,8 +74,8 @@ def extract_content(slide):
 
                 if 'textRun' in text_element:
                     _content = text_element.get('textRun').get('content')
-                    _style = text_element.get('textRun').get('style')
-                    _type = _get_type(_content, _style, paragraph_marker)
+                    _style_id = intern_style(text_element.get('textRun').get('style'))
+                    _type = _get_style_type(_content, _style_id, paragraph_marker)
 
                     interstitial |= _type == 'interstitial_title'
 
@@ -45,13 +83,13 @@ def extract_content(slide):
                         {
                             'paragraph_index': paragraph_index,
                             'content': _content,
-                            'style': _style,
+                            'style_id': _style_id,
                             'transform': transform,
                             'type': _type
                         }
                     )
 
-        elif _is_checkbox(shape):
+        elif is_checkbox(shape):
             checkbox |= True
 
         elif _is_radio(shape):
@@ -60,7 +98,7 @@ def extract_content(slide):
         elif _is_currency(shape):
             currency |= True
 
-        elif _is_comments_box(shape):
+        elif is_comments_box(shape):
             comments |= True
 
     if interstitial:
@@ -79,6 +117,124 @@ def extract_content(slide):
     return extracted if not skip else None
 
 
+def extract_structure(slide):
+    """
+    Extracts only what is needed for a manifest: whether the slide is skipped or an interstitial
+    and its title elements. Answer shapes are not inspected and other text is left out.
+    :param slide: The slide to extract
+    :return: The extracted title elements and block type ('Interstitial' or None), None if the slide is skipped
+    """
+    shapes = [e for e in slide.get('pageElements') if 'shape' in e]
+
+    # A skip shape anywhere resolves the slide without classifying any text
+    if any(_skip_slide(e.get('shape')) for e in shapes):
+        return None
+
+    extracted = {
+        'elements': [],
+        'answer_type': '',
+        'block_type': None
+    }
+
+    paragraph_index = 0
+
+    for element in (e for e in shapes if _is_text(e.get('shape'))):
+        for text_element in element.get('shape').get('text').get('textElements'):
+            if 'paragraphMarker' in text_element:
+                paragraph_index += 1
+
+            if 'textRun' in text_element:
+                _content = text_element.get('textRun').get('content')
+                _style_id = intern_style(text_element.get('textRun').get('style'))
+                # Bullet lists only affect guidance types, so the paragraph marker isn't needed for titles
+                _type = _get_style_type(_content, _style_id, None)
+
+                if _type in ('interstitial_title', 'block_title'):
+                    extracted['elements'].append(
+                        {
+                            'paragraph_index': paragraph_index,
+                            'content': _content,
+                            'style_id': _style_id,
+                            'transform': element.get('transform'),
+                            'type': _type
+                        }
+                    )
+
+                    if _type == 'interstitial_title':
+                        extracted['block_type'] = 'Interstitial'
+
+    return extracted
+
+
+def intern_style(style):
+    """
+    Interns a text run style, styles that only differ in fields the conversion doesn't read share a
+    single canonical copy (the first one seen)
+    :param style: The style dict of a text run
+    :return: An int id for the style, see get_style
+    """
+    key = style_key(style)
+    style_id = _style_ids.get(key)
+
+    if style_id is None:
+        with _style_lock:
+            style_id = _style_ids.get(key)
+            if style_id is None:
+                # Added to _styles before its id is published so get_style always finds it
+                _styles.append(style)
+                style_id = len(_styles) - 1
+                _style_ids[key] = style_id
+
+    return style_id
+
+
+def style_key(style):
+    """
+    Gets the fields of a style read by _get_type and process: font size, bold, the text colour and
+    whether there is a background colour. Any colour keys other than red, green and blue only
+    make the text non black, so only their number is kept.
+    :param style: The style dict of a text run
+    :return: A (font size or None, bold, (red, green, blue, number of colour keys) or None, has background)
+             tuple, None for an empty style
+    """
+    if not style:
+        return None
+
+    # Written out rather than using get_dict_nested_value as this is run for every text run
+    rgb_color = ((style.get('foregroundColor') or _EMPTY).get('opaqueColor') or _EMPTY).get('rgbColor')
+    background = (style.get('backgroundColor') or _EMPTY).get('opaqueColor')
+
+    return ((style.get('fontSize') or _EMPTY).get('magnitude') or None,
+            bool(style.get('bold')),
+            (rgb_color.get('red'), rgb_color.get('green'), rgb_color.get('blue'), len(rgb_color)) if rgb_color else None,
+            bool(background and background.get('rgbColor')))
+
+
+def get_style(style_id):
+    """
+    Gets the canonical style dict for an interned style id
+    :param style_id: An id returned by intern_style
+    :return: The style dict
+    """
+    return _styles[style_id]
+
+
+def _get_style_type(content, style_id, paragraph_marker):
+    """
+    Gets the element type of a text run, the type only depends on the style and whether the
+    paragraph is a bullet list (for non empty content) so is resolved once per combination
+    """
+    if not content:
+        return 'ignored'
+
+    key = (style_id, bool(_is_paragraph_bullet_list(paragraph_marker)))
+
+    if key not in _style_types:
+        _style_types[key] = _get_type(content, get_style(style_id), paragraph_marker)
+
+    return _style_types[key]
+
+
 def _get_type(content, style, paragraph_marker):
 
     if _ignore_text(content, style):
@@ -125,7 +281,7 @@ def _is_text(shape):
     return shape.get('shapeType') == 'TEXT_BOX' and 'text' in shape
 
 
-def _is_checkbox(shape):
+def is_checkbox(shape):
     """ Checks if this shape represents a Checkbox question; a RECTANGLE with a red outline """
     if shape.get('shapeType') != 'RECTANGLE':
         return False
@@ -135,7 +291,7 @@ def _is_checkbox(shape):
     return 'blue' not in color and 'green' not in color and 'red' in color and color.get('red') == 1
 
 
-def _is_comments_box(shape):
+def is_comments_box(shape):
     """ Checks if this shape represents a Comments question; RECTANGLE with a green outline """
     if shape.get('shapeType') != 'RECTANGLE':
         return False
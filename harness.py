@@ -0,0 +1,353 @@
+#!/usr/bin/env python
+"""
+Golden corpus harness for checking that alternative extraction/processing engines produce the same
+output as the reference (scalar) implementation.
+
+The corpus is a directory of recorded presentations, one directory per presentation:
+
+    <corpus>/<name>/presentation.json   the presentation as returned by the Google Slides API
+    <corpus>/<name>/manifest.yaml       the expected manifest
+    <corpus>/<name>/blocks/<id>.yaml    the expected blocks
+"""
+import argparse
+import copy
+import importlib
+import json
+import os
+import pathlib
+import random
+import sys
+import tempfile
+import yaml
+
+from concurrent.futures import ProcessPoolExecutor
+
+from core import convert_slides, convert_contents, extract_slides, ConversionResult
+from ir import load_ir, write_ir
+
+PRESENTATION_FILE = 'presentation.json'
+MANIFEST_FILE = 'manifest.yaml'
+BLOCKS_DIR = 'blocks'
+
+
+def scalar_engine(slides, survey_title):
+    return convert_slides(slides, survey_title, engine='scalar')
+
+
+def columnar_engine(slides, survey_title):
+    return convert_slides(slides, survey_title, engine='columnar')
+
+
+def ir_engine(slides, survey_title):
+    """ Extracts with the scalar engine and processes after a round trip through an IR file """
+    slide_ids = [slide.get('objectId') for slide in slides]
+
+    with tempfile.TemporaryDirectory() as ir_dir:
+        ir_file = os.path.join(ir_dir, 'presentation.ir')
+        write_ir(ir_file, slide_ids, list(extract_slides(slides)))
+        slide_ids, contents = load_ir(ir_file)
+
+        # Closed before the temporary directory is removed, a mapped file can't be deleted on Windows
+        with contents:
+            return convert_contents(slide_ids, contents, survey_title)
+
+
+ENGINES = {
+    'scalar': scalar_engine,
+    'columnar': columnar_engine,
+    'ir': ir_engine
+}
+
+
+def get_engine(name):
+    """
+    Gets an engine by name, either a built in engine or 'module:function' for any function
+    taking (slides, survey_title) and returning a ConversionResult
+    """
+    if name in ENGINES:
+        return ENGINES[name]
+
+    module_name, _, function_name = name.partition(':')
+    if not function_name:
+        raise ValueError('unknown engine {}, expected one of {} or module:function'.format(
+            name, ', '.join(ENGINES)))
+
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def record(corpus, name, presentation, survey_title):
+    """
+    Records a presentation and its expected output (from the reference engine) in the corpus
+    """
+    fixture_dir = pathlib.Path(corpus, name)
+    blocks_dir = fixture_dir / BLOCKS_DIR
+    blocks_dir.mkdir(parents=True, exist_ok=True)
+
+    with open(fixture_dir / PRESENTATION_FILE, 'w') as f:
+        json.dump(presentation, f, indent=1, sort_keys=True)
+
+    result = scalar_engine(presentation.get('slides'), survey_title)
+
+    with open(fixture_dir / MANIFEST_FILE, 'w') as f:
+        yaml.dump(result.manifest, f, default_flow_style=False)
+
+    for block in result.blocks:
+        with open(blocks_dir / (block['id'] + '.yaml'), 'w') as f:
+            yaml.dump(block, f, default_flow_style=False)
+
+
+def check_fixture(fixture_dir, engine_name):
+    """
+    Runs an engine against a recorded presentation and compares it with the expected output
+    :return: A list of differences, empty if the output matches
+    """
+    with open(os.path.join(fixture_dir, PRESENTATION_FILE)) as f:
+        slides = json.load(f).get('slides')
+
+    with open(os.path.join(fixture_dir, MANIFEST_FILE)) as f:
+        expected_manifest = yaml.safe_load(f)
+
+    expected_blocks = {}
+    for block_file in sorted(pathlib.Path(fixture_dir, BLOCKS_DIR).glob('*.yaml')):
+        with open(block_file) as f:
+            block = yaml.safe_load(f)
+            expected_blocks[block['id']] = block
+
+    result = get_engine(engine_name)(slides, expected_manifest.get('title'))
+
+    return compare(expected_manifest, expected_blocks, result)
+
+
+def fuzz_fixture(fixture_dir, engine_name, iterations, seed):
+    """
+    Mutates a recorded presentation and checks the engine still matches the reference engine
+    on each mutation
+    :return: A list of differences, empty if the output matches every time
+    """
+    with open(os.path.join(fixture_dir, PRESENTATION_FILE)) as f:
+        presentation = json.load(f)
+
+    engine = get_engine(engine_name)
+    rand = random.Random('{}:{}'.format(seed, os.path.basename(fixture_dir)))
+    differences = []
+
+    for iteration in range(iterations):
+        mutation = rand.choice(sorted(MUTATIONS))
+        slides = copy.deepcopy(presentation.get('slides'))
+        MUTATIONS[mutation](rand, slides)
+
+        reference = _normalise(scalar_engine(slides, 'fuzz'))
+        expected_blocks = {block['id']: block for block in reference.blocks}
+
+        for difference in compare(reference.manifest, expected_blocks, engine(slides, 'fuzz')):
+            differences.append('mutation #{} ({}): {}'.format(iteration + 1, mutation, difference))
+
+    return differences
+
+
+def compare(expected_manifest, expected_blocks, result):
+    """
+    Compares a ConversionResult with the expected manifest and blocks
+    :return: A list of differences, per slide for blocks
+    """
+    result = _normalise(result)
+    differences = ['manifest {}'.format(d) for d in structural_diff(expected_manifest, result.manifest)]
+
+    seen = set()
+    for slide in result.slides:
+        if not slide.block:
+            continue
+
+        block_id = slide.block['id']
+        seen.add(block_id)
+        prefix = 'slide #{} (id={}) block {}'.format(slide.index + 1, slide.slide_id, block_id)
+
+        if block_id not in expected_blocks:
+            differences.append('{}: unexpected block'.format(prefix))
+        else:
+            differences += ['{} {}'.format(prefix, d) for d in structural_diff(expected_blocks[block_id], slide.block)]
+
+    for block_id in sorted(set(expected_blocks) - seen):
+        differences.append('block {}: missing'.format(block_id))
+
+    return differences
+
+
+def structural_diff(expected, actual, path=''):
+    """
+    Yields a description of each difference between two values built from dicts, lists and scalars
+    """
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        for key in sorted(set(expected) | set(actual), key=str):
+            key_path = '{}.{}'.format(path, key)
+            if key not in actual:
+                yield '{}: missing'.format(key_path)
+            elif key not in expected:
+                yield '{}: unexpected {!r}'.format(key_path, actual[key])
+            else:
+                yield from structural_diff(expected[key], actual[key], key_path)
+
+    elif isinstance(expected, list) and isinstance(actual, list):
+        if len(expected) != len(actual):
+            yield '{}: expected {} items, got {}'.format(path, len(expected), len(actual))
+        for i, (x, y) in enumerate(zip(expected, actual)):
+            yield from structural_diff(x, y, '{}[{}]'.format(path, i))
+
+    elif expected != actual:
+        yield '{}: expected {!r}, got {!r}'.format(path, expected, actual)
+
+
+def _normalise(result):
+    """ Round trips the manifest and blocks through YAML so they compare like the recorded files """
+    def normalise(x):
+        return yaml.safe_load(yaml.dump(x, default_flow_style=False))
+
+    slides = [s._replace(block=normalise(s.block)) if s.block else s for s in result.slides]
+    return ConversionResult(normalise(result.manifest), [normalise(b) for b in result.blocks], slides)
+
+
+def _text_shapes(slides):
+    return [e for slide in slides for e in slide.get('pageElements') or []
+            if e.get('shape', {}).get('shapeType') == 'TEXT_BOX' and 'text' in e['shape']]
+
+
+def _reorder_elements(rand, slides):
+    """ Shuffles the page elements of a slide """
+    slide = rand.choice(slides)
+    rand.shuffle(slide.get('pageElements') or [])
+
+
+def _split_text_run(rand, slides):
+    """ Splits a text run in two, with the same style """
+    text_runs = [(shape['shape']['text']['textElements'], i)
+                 for shape in _text_shapes(slides)
+                 for i, text_element in enumerate(shape['shape']['text']['textElements'])
+                 if len(text_element.get('textRun', {}).get('content') or '') > 1]
+
+    if text_runs:
+        text_elements, i = rand.choice(text_runs)
+        text_run = text_elements[i]['textRun']
+        split = rand.randint(1, len(text_run['content']) - 1)
+        second = copy.deepcopy(text_elements[i])
+        second['textRun']['content'] = text_run['content'][split:]
+        text_run['content'] = text_run['content'][:split]
+        text_elements.insert(i + 1, second)
+
+
+def _jitter_translate_y(rand, slides):
+    """ Moves a text box up or down slightly """
+    shapes = _text_shapes(slides)
+
+    if shapes:
+        transform = rand.choice(shapes).setdefault('transform', {})
+        transform['translateY'] = (transform.get('translateY') or 0) + rand.uniform(-10000, 10000)
+
+
+MUTATIONS = {
+    'reorder_elements': _reorder_elements,
+    'split_text_run': _split_text_run,
+    'jitter_translate_y': _jitter_translate_y
+}
+
+
+def _fixtures(corpus):
+    return sorted(str(p.parent) for p in pathlib.Path(corpus).glob('*/' + PRESENTATION_FILE))
+
+
+def run(flags):
+    fixtures = _fixtures(flags.corpus)
+
+    if not fixtures:
+        print('No recorded presentations found in {}'.format(flags.corpus))
+        return 1
+
+    with ProcessPoolExecutor() as executor:
+        checks = [executor.submit(check_fixture, fixture, flags.engine) for fixture in fixtures]
+        fuzzes = [executor.submit(fuzz_fixture, fixture, flags.engine, flags.fuzz, flags.seed) for fixture in fixtures]
+
+        failed = 0
+        for fixture, check, fuzz in zip(fixtures, checks, fuzzes):
+            differences = check.result() + fuzz.result()
+            failed += bool(differences)
+            print('{}: {}'.format(os.path.basename(fixture), 'FAIL' if differences else 'OK'))
+            for difference in differences:
+                print('  ' + difference)
+
+    print('{} of {} presentations differ from the reference using the {} engine'.format(
+        failed, len(fixtures), flags.engine))
+
+    return 1 if failed else 0
+
+
+def _record_presentation(flags):
+    # Imported here so checking a corpus doesn't need the Google API client
+    from apiclient import discovery
+    from auth import auth_http
+
+    service = discovery.build('slides', 'v1', http=auth_http(flags))
+    presentation = service.presentations().get(presentationId=flags.record).execute()
+
+    record(flags.corpus, flags.name or flags.record, presentation, flags.survey_title)
+
+
+def _auth_parsers(args):
+    """
+    Gets the parent parsers for the Google API authorisation flags, these are only needed (and oauth2client
+    only imported) when recording a presentation so checking a corpus works without the Google API client
+    :param args: The command line arguments
+    :return: A list of parent parsers
+    """
+    recording = argparse.ArgumentParser(add_help=False)
+    recording.add_argument('--record', type=str)
+
+    if not recording.parse_known_args(args)[0].record:
+        return []
+
+    from oauth2client import tools
+    return [tools.argparser]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(parents=_auth_parsers(sys.argv[1:]))
+
+    parser.add_argument('--corpus',
+                        type=str,
+                        default='corpus',
+                        help='The directory path of the recorded presentations')
+
+    parser.add_argument('--engine',
+                        type=str,
+                        default='columnar',
+                        help='The engine to check: {} or module:function'.format(', '.join(ENGINES)))
+
+    parser.add_argument('--fuzz',
+                        type=int,
+                        default=20,
+                        help='The number of mutations of each presentation to check')
+
+    parser.add_argument('--seed',
+                        type=int,
+                        default=0,
+                        help='The random seed for mutations')
+
+    parser.add_argument('--record',
+                        type=str,
+                        metavar='PRESENTATION_ID',
+                        help='Record a presentation and its reference output in the corpus instead of checking, the '
+                             'Google API authorisation flags can also be given when recording')
+
+    parser.add_argument('--name',
+                        type=str,
+                        help='The name to record the presentation as, defaults to its id')
+
+    parser.add_argument('--survey_title',
+                        type=str,
+                        default='manifest',
+                        help='The survey title to record the presentation with')
+
+    _flags = parser.parse_args()
+
+    if _flags.record:
+        _record_presentation(_flags)
+    else:
+        sys.exit(run(_flags))
@@ -0,0 +1,58 @@
+"""
+Id and title number generation. The same titles are seen many times in a run (every answer id of a
+block is generated from its title) so results are cached, the caches are bounded and safe to share.
+"""
+import re
+
+from functools import lru_cache
+
+_NON_ALPHANUMERIC = re.compile('[^0-9a-zA-Z]+')
+_TITLE_NUMBER = re.compile(r'^([0-9.]*)?\s*(.*)')
+
+_CACHE_SIZE = 4096
+
+
+def generate_id(*args):
+    """
+    Generate an id value from a list of arguments (lowercase with - separators)
+    :param args: Arbitrary length list of arguments to form the id from
+    :return: A str id value
+    """
+    return _generate_id(tuple(str(x) for x in args if x != ''))
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def _generate_id(parts):
+    return _NON_ALPHANUMERIC.sub('-', '-'.join(parts).lower())
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def extract_title_number(text):
+    """
+    Extracts the question/block number and title from a line of text
+    Example format: '2.3 What is your name?'
+    :param text: Text optionally containing a block/question number
+    :return: A (number, title) tuple extracted from the original 'text'
+    """
+    number, title = _TITLE_NUMBER.match(text).groups()
+
+    # Strip trailing dot .
+    if number and number[-1] == '.':
+        number = number[0:-1]
+
+    return number, title
+
+
+def check_unique_id(ids, _id):
+    """
+    Adds an id to the set of ids already used in a run
+    :param ids: The set of ids used so far
+    :param _id: The id to add
+    :return: The id
+    :raises ValueError: If the id has already been used
+    """
+    if _id in ids:
+        raise ValueError('duplicate id: {}'.format(_id))
+
+    ids.add(_id)
+    return _id
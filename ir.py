@@ -0,0 +1,225 @@
+"""
+Compact binary intermediate representation (IR) of the content extracted from a presentation,
+so it can be processed again without fetching or extracting it.
+
+Layout (little endian):
+
+    header    magic 'GSIR', version, slide, element, style and string counts
+    slides    per slide: slide id string, block type (0 if skipped, otherwise BLOCK_TYPES index + 1),
+              index of its first element and number of elements
+    styles    per style, the fields that are read (see extract.style_key): font size (NaN if none),
+              bold, has a background colour, number of text colour keys (0 if none), red, green and
+              blue (NaN if missing)
+    elements  per element: paragraph index, content string, style, type, translateY
+    strings   string end offsets followed by the UTF-8 string data
+
+Loading memory maps the file and only decodes a slide's elements and strings when that slide is used.
+"""
+import math
+import mmap
+import struct
+
+from collections.abc import Sequence
+
+from extract import BLOCK_TYPES, ELEMENT_TYPES, intern_style, get_style, style_key
+
+MAGIC = b'GSIR'
+VERSION = 2
+
+_HEADER = struct.Struct('<4sHIIII')
+_SLIDE = struct.Struct('<IBII')
+_STYLE = struct.Struct('<dBBBddd')
+_ELEMENT = struct.Struct('<IIIBd')
+_OFFSET = struct.Struct('<I')
+
+# String index stored for content that is None
+_NONE = 0xFFFFFFFF
+
+_COLOURS = ('red', 'green', 'blue')
+
+
+def write_ir(path, slide_ids, contents):
+    """
+    Writes extracted slides to an IR file
+    :param path: The path of the file to write
+    :param slide_ids: The object id of each slide
+    :param contents: The extracted content of each slide (see extract_content), None for skipped slides
+    """
+    strings = {}
+    styles = {}
+    slides = bytearray()
+    elements = bytearray()
+    n_elements = 0
+
+    for slide_id, content in zip(slide_ids, contents):
+        block_type = BLOCK_TYPES.index(content['block_type']) + 1 if content else 0
+        slide_elements = content.get('elements') if content else []
+        slides += _SLIDE.pack(_string_index(strings, slide_id), block_type, n_elements, len(slide_elements))
+        n_elements += len(slide_elements)
+
+        for element in slide_elements:
+            style_index = styles.setdefault(element['style_id'], len(styles))
+            content_index = _NONE if element['content'] is None else _string_index(strings, element['content'])
+
+            elements += _ELEMENT.pack(element['paragraph_index'],
+                                      content_index,
+                                      style_index,
+                                      ELEMENT_TYPES.index(element['type']),
+                                      element['transform'].get('translateY') or 0)
+
+    encoded = [s.encode('utf-8') for s in strings]
+    offsets = bytearray()
+    end = 0
+    for data in encoded:
+        end += len(data)
+        offsets += _OFFSET.pack(end)
+
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(slide_ids), n_elements, len(styles), len(strings)))
+        f.write(slides)
+        f.writelines(_pack_style(get_style(style_id)) for style_id in styles)
+        f.write(elements)
+        f.write(offsets)
+        f.write(b''.join(encoded))
+
+
+def load_ir(path):
+    """
+    Loads extracted slides from an IR file. The file is memory mapped rather than read and each
+    slide is only decoded when it is used, the contents must be closed (or used as a context manager)
+    to unmap the file once they are no longer needed.
+    :param path: The path of the IR file
+    :return: A tuple of the slide ids and an IRContents of the extracted content of each slide (None for
+    skipped slides), as passed to write_ir
+    """
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    try:
+        ir = _IRFile(path, mapped)
+    except Exception:
+        mapped.close()
+        raise
+
+    return [ir.string(slide[0]) for slide in ir.slides], IRContents(ir, range(len(ir.slides)))
+
+
+class IRContents(Sequence):
+    """
+    The extracted content of the slides of an IR file, decoded from the memory map on access. Slices
+    share the memory map of the contents they were taken from, closing any of them closes it.
+    """
+
+    def __init__(self, ir, indices):
+        self._ir = ir
+        self._indices = indices
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """ Unmaps the IR file, slides can't be decoded once it is closed """
+        self._ir.mapped.close()
+
+    def __len__(self):
+        return len(self._indices)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return IRContents(self._ir, self._indices[index])
+
+        return self._ir.content(self._indices[index])
+
+
+class _IRFile(object):
+
+    def __init__(self, path, mapped):
+        magic, version, n_slides, n_elements, n_styles, n_strings = _HEADER.unpack_from(mapped)
+
+        if magic != MAGIC:
+            raise ValueError('{} is not an IR file'.format(path))
+
+        if version != VERSION:
+            raise ValueError('{} has unsupported IR version {}'.format(path, version))
+
+        self.mapped = mapped
+
+        slides_start = _HEADER.size
+        styles_start = slides_start + n_slides * _SLIDE.size
+        self.elements_start = styles_start + n_styles * _STYLE.size
+        self.offsets_start = self.elements_start + n_elements * _ELEMENT.size
+        self.strings_start = self.offsets_start + n_strings * _OFFSET.size
+
+        self.slides = list(_SLIDE.iter_unpack(mapped[slides_start:styles_start]))
+
+        # Styles are interned again as their ids are only valid in the process that wrote the file
+        self.style_ids = [intern_style(_unpack_style(*fields))
+                          for fields in _STYLE.iter_unpack(mapped[styles_start:self.elements_start])]
+
+    def string(self, index):
+        start = _OFFSET.unpack_from(self.mapped, self.offsets_start + (index - 1) * _OFFSET.size)[0] if index else 0
+        end = _OFFSET.unpack_from(self.mapped, self.offsets_start + index * _OFFSET.size)[0]
+        return str(self.mapped[self.strings_start + start:self.strings_start + end], 'utf-8')
+
+    def content(self, slide_index):
+        _, block_type, first_element, n_elements = self.slides[slide_index]
+
+        if not block_type:
+            return None
+
+        start = self.elements_start + first_element * _ELEMENT.size
+        elements = []
+
+        for paragraph_index, content, style, element_type, translate_y in \
+                _ELEMENT.iter_unpack(self.mapped[start:start + n_elements * _ELEMENT.size]):
+            elements.append({
+                'paragraph_index': paragraph_index,
+                'content': None if content == _NONE else self.string(content),
+                'style_id': self.style_ids[style],
+                'transform': {'translateY': translate_y},
+                'type': ELEMENT_TYPES[element_type]
+            })
+
+        return {
+            'elements': elements,
+            'answer_type': '',
+            'block_type': BLOCK_TYPES[block_type - 1]
+        }
+
+
+def _pack_style(style):
+    font_size, bold, rgb_color, background = style_key(style) or (None, False, None, False)
+    red, green, blue, colour_keys = rgb_color or (None, None, None, 0)
+
+    return _STYLE.pack(math.nan if font_size is None else font_size, bold, background, colour_keys,
+                       *(math.nan if x is None else x for x in (red, green, blue)))
+
+
+def _unpack_style(font_size, bold, background, colour_keys, *rgb):
+    """ Rebuilds a style with the same fields as the one written, see _pack_style """
+    style = {}
+
+    if bold:
+        style['bold'] = True
+
+    if not math.isnan(font_size):
+        style['fontSize'] = {'magnitude': font_size}
+
+    if colour_keys:
+        rgb_color = {name: x for name, x in zip(_COLOURS, rgb) if not math.isnan(x)}
+        # The names of any other colour keys aren't kept, only that they make the text non black
+        rgb_color.update(('other{}'.format(i), 0) for i in range(colour_keys - len(rgb_color)))
+        style['foregroundColor'] = {'opaqueColor': {'rgbColor': rgb_color}}
+
+    if background:
+        # Only whether there is a background colour is kept, not the colour itself
+        style['backgroundColor'] = {'opaqueColor': {'rgbColor': {'red': 1}}}
+
+    return style
+
+
+def _string_index(strings, value):
+    return strings.setdefault(value, len(strings))
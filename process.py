@@ -1,11 +1,16 @@
-import re
-
+"""
+Processing of extracted slide content into schema ready blocks. These functions only depend on
+their arguments, the style table of extract.py (which they read while other threads may be adding to
+it) and the caches of ids.py, so are safe to call concurrently; see core for how that state is shared.
+"""
+from extract import get_style
+from ids import generate_id, extract_title_number
 from utils import get_dict_nested_value
 
 
 def process_content(index, extracted):
 
-    elements = sorted(extracted.get('elements'), key=_get_transform_y)
+    elements = _ordered_elements(extracted)
 
     is_interstitial = _is_interstitial(elements)
 
@@ -36,18 +41,29 @@ def process_content(index, extracted):
     return block
 
 
-def generate_id(*args):
+def process_block_id(index, extracted):
     """
-    Generate an id value from a list of arguments (lowercase with - separators)
-    :param args: Arbitrary length list of arguments to form the id from
-    :return: A str id value
+    Generates only the block id for extracted content, as process_content would
+    :param index: The index of the slide
+    :param extracted: The extracted content, only the title elements are used
+    :return: A str block id
     """
-    _id = '-'.join([str(x) for x in args if x != ''])
+    elements = _ordered_elements(extracted)
+
+    block_title_name = 'interstitial_title' if _is_interstitial(elements) else 'block_title'
+
+    return generate_id(_process_title(elements, block_title_name), 'block', index)
 
-    _id = _id.lower()
 
-    parts = re.sub('[^0-9a-zA-Z]+', '-', _id)
-    return ''.join(parts)
+def _ordered_elements(extracted):
+    """
+    Gets the elements of extracted content ordered by y-transform, content marked as 'ordered'
+    (e.g. by the columnar engine) already is so isn't sorted again
+    """
+    if extracted.get('ordered'):
+        return extracted.get('elements')
+
+    return sorted(extracted.get('elements'), key=_get_transform_y)
 
 
 def _process_answers(block_type, block_title, index, elements):
@@ -267,7 +283,7 @@ def _element_to_html(element):
     :param element: the element to convert to HTML
     :return: an HTML formatted str
     """
-    style = element.get('style')
+    style = get_style(element.get('style_id'))
     content = element.get('content')
 
     if style and content:
@@ -356,7 +372,8 @@ def _new_lines_to_html_paragraphs(content):
 def _process_title(elements, element_type):
     content = _content_for_type_as_html_list(elements, element_type)
     title = _clean_join(content)
-    return _extract_title_number(title).get('title')
+    _, title = extract_title_number(title)
+    return title
 
 
 def _process_label(elements, element_type):
@@ -367,7 +384,8 @@ def _process_label(elements, element_type):
 def _process_number(elements, element_type):
     content = _content_for_type_as_html_list(elements, element_type)
     title = _clean_join(content)
-    return _extract_title_number(title).get('number')
+    number, _ = extract_title_number(title)
+    return number
 
 
 def _process_description(elements, element_type):
@@ -416,21 +434,3 @@ def _strip_option(option):
 
     return clean
 
-
-def _extract_title_number(text):
-    """
-    Extracts the question/block number and title from a line of text
-    Example format: '2.3 What is your name?'
-    :param text: Text optionally containing a block/question number
-    :return: A dict with the 'number' and 'title' extracted from the original 'text'
-    """
-    match = re.match('^([0-9.]*)?\s*(.*)', text)
-    groups = match.groups()
-    number = groups[0]
-    title = groups[1]
-
-    # Strip trailing dot .
-    if number and number[-1] == '.':
-        number = number[0:-1]
-
-    return {'number': number, 'title': title}
@@ -0,0 +1,103 @@
+"""
+Checks the asyncio API gives the same blocks, groups and manifest as converting in one go, and that
+blocks are streamed while the rest of the slides are still being fetched.
+"""
+import asyncio
+import json
+import pathlib
+import time
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import aio
+from core import convert_slides
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+CORPUS = ROOT / 'corpus'
+
+FETCH_SECONDS = 0.05
+
+
+class _Request:
+
+    def __init__(self, result, delay=0, fetched=None):
+        self.result = result
+        self.delay = delay
+        self.fetched = fetched
+
+    def execute(self):
+        time.sleep(self.delay)
+        if self.fetched is not None:
+            self.fetched.append(time.perf_counter())
+        return self.result
+
+
+class _SlowService:
+    """ Stands in for the Slides API service, fetching each page takes FETCH_SECONDS """
+
+    def __init__(self, slides):
+        self.slides = {slide['objectId']: slide for slide in slides}
+        self.slide_ids = [slide['objectId'] for slide in slides]
+        # When each page fetch finished
+        self.fetched = []
+
+    def presentations(self):
+        return self
+
+    def pages(self):
+        return self
+
+    def get(self, presentationId, pageObjectId=None, fields=None):
+        if pageObjectId is None:
+            return _Request({'slides': [{'objectId': slide_id} for slide_id in self.slide_ids]})
+
+        return _Request(self.slides[pageObjectId], FETCH_SECONDS, self.fetched)
+
+
+def _slides():
+    slides = json.loads((CORPUS / 'household' / 'presentation.json').read_text()).get('slides')
+
+    # Skipped slides so there are many more fetches than workers
+    return slides + [{'objectId': 'skipped-{}'.format(i), 'pageElements': [{'shape': {'shapeType': 'NO_SMOKING'}}]}
+                     for i in range(34)]
+
+
+async def _stream(**kwargs):
+    events = []
+    async for event, value in aio.stream_presentation(survey_title='household', **kwargs):
+        events.append((event, value, time.perf_counter()))
+    return events
+
+
+class TestStreamPresentation(unittest.TestCase):
+
+    def test_same_as_convert_slides(self):
+        slides = _slides()
+        expected = convert_slides(slides, 'household')
+
+        events = asyncio.run(_stream(presentation={'slides': slides}))
+
+        self.assertEqual(expected.blocks, [value.block for event, value, _ in events if event == 'block'])
+        self.assertEqual(expected.manifest['groups'], [value for event, value, _ in events if event == 'group'])
+        self.assertEqual(('manifest', expected.manifest), events[-1][:2])
+
+    def test_blocks_stream_before_fetching_finishes(self):
+        slides = _slides()
+        service = _SlowService(slides)
+
+        with mock.patch.object(aio, '_build_service', lambda http: service), \
+                ThreadPoolExecutor(4) as executor:
+            events = asyncio.run(_stream(presentation_id='household', executor=executor))
+
+        first_block = next(at for event, _, at in events if event == 'block')
+
+        self.assertEqual(len(slides), len(service.fetched))
+        self.assertLess(first_block, max(service.fetched) - 4 * FETCH_SECONDS)
+        self.assertEqual(convert_slides(slides, 'household').blocks,
+                         [value.block for event, value, _ in events if event == 'block'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+"""
+Checks the columnar engine extracts the same content as the scalar engine (extract_content), on the
+corpus presentations and on randomised variations of them.
+"""
+import copy
+import importlib.util
+import json
+import pathlib
+import random
+import unittest
+
+from extract import extract_content
+from harness import MUTATIONS, _text_shapes
+from process import process_content, _get_transform_y
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+CORPUS = ROOT / 'corpus'
+
+BLACK = {'red': 0.13333334, 'green': 0.13333334, 'blue': 0.13333334}
+
+# Styles that exercise the edge cases of classification
+STYLES = [
+    None,
+    {},
+    {'fontSize': {'magnitude': 16.0}},
+    {'fontSize': {'magnitude': 16}, 'bold': True},
+    {'fontSize': {'magnitude': 16}, 'bold': False, 'foregroundColor': {'opaqueColor': {'rgbColor': BLACK}}},
+    {'fontSize': {'magnitude': 14}, 'foregroundColor': {'opaqueColor': {'rgbColor': {}}}},
+    {'fontSize': {'magnitude': 14}, 'foregroundColor': {'opaqueColor': {'rgbColor': dict(BLACK, blue=1)}}},
+    {'fontSize': {'magnitude': 14}, 'foregroundColor': {'opaqueColor': {'rgbColor': {'red': 0.13333334}}}},
+    {'fontSize': {'magnitude': 14}, 'foregroundColor': {'opaqueColor': {'rgbColor': dict(BLACK, alpha=1)}}},
+    {'fontSize': {'magnitude': 20}, 'backgroundColor': {'opaqueColor': {'rgbColor': {'red': 1}}}},
+    {'fontSize': {'magnitude': 0}},
+    {'fontSize': {}},
+    {'fontSize': {'magnitude': 30}, 'foregroundColor': {'opaqueColor': {}}},
+    {'fontSize': {'magnitude': 9}, 'foregroundColor': {'opaqueColor': {'rgbColor': BLACK}}}
+]
+
+
+def _presentations():
+    return [json.loads(path.read_text()).get('slides') for path in sorted(CORPUS.glob('*/presentation.json'))]
+
+
+def _randomise(rand, slides):
+    """ Mutates slides as the harness does and changes the style and content of some text runs """
+    for _ in range(rand.randint(1, 4)):
+        MUTATIONS[rand.choice(sorted(MUTATIONS))](rand, slides)
+
+    for shape in _text_shapes(slides):
+        for text_element in shape['shape']['text']['textElements']:
+            if 'textRun' in text_element:
+                if rand.random() < 0.2:
+                    text_element['textRun']['style'] = copy.deepcopy(rand.choice(STYLES))
+                if rand.random() < 0.05:
+                    text_element['textRun']['content'] = ''
+
+        if rand.random() < 0.05:
+            shape['transform'].pop('translateY', None)
+
+
+@unittest.skipIf(importlib.util.find_spec('numpy') is None, 'the columnar engine needs NumPy')
+class TestColumnar(unittest.TestCase):
+
+    def assertSameContent(self, slides):
+        from columnar import extract_deck
+
+        expected = [extract_content(slide) for slide in slides]
+        actual = extract_deck(slides)
+
+        self.assertEqual(len(expected), len(actual))
+
+        for index, (scalar, columnar) in enumerate(zip(expected, actual)):
+            if scalar is None:
+                self.assertIsNone(columnar)
+                continue
+
+            # The columnar engine orders elements as process_content would
+            ordered = dict(scalar, elements=sorted(scalar['elements'], key=_get_transform_y), ordered=True)
+            self.assertEqual(ordered, columnar)
+            self.assertEqual(process_content(index, scalar), process_content(index, columnar))
+
+    def test_corpus(self):
+        presentations = _presentations()
+        self.assertTrue(presentations, 'no presentations found in {}'.format(CORPUS))
+
+        for slides in presentations:
+            self.assertSameContent(slides)
+
+    def test_randomised_decks(self):
+        rand = random.Random(0)
+        presentations = _presentations()
+
+        for _ in range(200):
+            slides = copy.deepcopy(rand.choice(presentations))
+            _randomise(rand, slides)
+            self.assertSameContent(slides)
+
+    def test_empty_deck(self):
+        from columnar import extract_deck
+
+        self.assertEqual([], extract_deck([]))
+        self.assertEqual([dict(extract_content({'pageElements': []}), ordered=True)],
+                         extract_deck([{'pageElements': []}]))
+
+
+if __name__ == '__main__':
+    unittest.main()
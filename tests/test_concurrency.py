@@ -0,0 +1,140 @@
+"""
+Checks the conversion core can be used concurrently: from several threads (and that it scales across
+them on free-threaded CPython) and from sub-interpreters.
+"""
+import json
+import os
+import pathlib
+import sys
+import tempfile
+import time
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+
+from core import convert_slides
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+CORPUS = ROOT / 'corpus'
+
+
+def _presentations():
+    return [(path.parent.name, json.loads(path.read_text()).get('slides'))
+            for path in sorted(CORPUS.glob('*/presentation.json'))]
+
+
+def _convert(name, slides):
+    result = convert_slides(slides, name)
+    return result.manifest, result.blocks
+
+
+def _gil_enabled():
+    # Only free-threaded builds of Python 3.13+ can run without the GIL
+    return getattr(sys, '_is_gil_enabled', lambda: True)()
+
+
+def _sub_interpreters():
+    """ Gets a function running code in a new sub-interpreter, or None if they aren't supported """
+    try:
+        from concurrent import interpreters
+    except ImportError:
+        try:
+            import interpreters
+        except ImportError:
+            interpreters = None
+
+    if interpreters is not None:
+        def run(code):
+            interpreter = interpreters.create()
+            try:
+                interpreter.exec(code)
+            finally:
+                interpreter.close()
+
+        return run
+
+    try:
+        import _interpreters
+    except ImportError:
+        try:
+            import _xxsubinterpreters as _interpreters
+        except ImportError:
+            return None
+
+    def run(code):
+        interpreter = _interpreters.create()
+        try:
+            # Older versions raise on failure, newer ones return the exception details
+            failure = _interpreters.run_string(interpreter, code)
+            if failure:
+                raise AssertionError('sub-interpreter failed: {}'.format(failure))
+        finally:
+            _interpreters.destroy(interpreter)
+
+    return run
+
+
+class TestThreads(unittest.TestCase):
+
+    def setUp(self):
+        self.presentations = _presentations()
+        self.assertTrue(self.presentations, 'no presentations found in {}'.format(CORPUS))
+
+    def test_threaded_matches_serial(self):
+        jobs = self.presentations * 8
+        expected = [_convert(name, slides) for name, slides in jobs]
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            actual = list(executor.map(lambda job: _convert(*job), jobs))
+
+        self.assertEqual(expected, actual)
+
+    @unittest.skipIf(_gil_enabled(), 'needs free-threaded Python with the GIL disabled')
+    @unittest.skipIf((os.cpu_count() or 1) < 4, 'needs at least 4 CPUs')
+    def test_threads_scale_without_gil(self):
+        jobs = self.presentations * 100
+        workers = 4
+
+        # Warm up the style and id caches so both runs do the same work
+        [_convert(name, slides) for name, slides in self.presentations]
+
+        start = time.perf_counter()
+        [_convert(name, slides) for name, slides in jobs]
+        serial = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(lambda job: _convert(*job), jobs))
+        threaded = time.perf_counter() - start
+
+        # Loose bound, a perfect speed up would be serial / workers
+        self.assertLess(threaded, serial / 2, 'threaded {:.2f}s, serial {:.2f}s'.format(threaded, serial))
+
+
+class TestSubInterpreters(unittest.TestCase):
+
+    @unittest.skipIf(_sub_interpreters() is None, 'sub-interpreters are not supported')
+    def test_sub_interpreter_matches_main_interpreter(self):
+        name, slides = _presentations()[0]
+        expected = json.loads(json.dumps(_convert(name, slides)))
+
+        with tempfile.TemporaryDirectory() as out_dir:
+            out_file = os.path.join(out_dir, 'result.json')
+
+            _sub_interpreters()('\n'.join([
+                'import json, sys',
+                'sys.path.insert(0, {!r})'.format(str(ROOT)),
+                'from core import convert_slides',
+                'with open({!r}) as f:'.format(str(CORPUS / name / 'presentation.json')),
+                '    slides = json.load(f).get("slides")',
+                'result = convert_slides(slides, {!r})'.format(name),
+                'with open({!r}, "w") as f:'.format(out_file),
+                '    json.dump([result.manifest, result.blocks], f)',
+            ]))
+
+            with open(out_file) as f:
+                self.assertEqual(expected, json.load(f))
+
+
+if __name__ == '__main__':
+    unittest.main()